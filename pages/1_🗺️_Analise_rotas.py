@@ -1,12 +1,15 @@
 import streamlit as st
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import os
 import pandas as pd
-from route import Route, RouteGroup
+from route import Route, RouteGroup, calculate_distance
 from utils import COLORS
 
 GPX_FILE_PATH = 'data/gpx/'
 ROUTES_INDEX_PATH = 'data/routes-index.csv'
+ROUTES_INDEX_PARQUET_PATH = 'data/routes-index.parquet'  # Built by scripts/build_routes_index.py
+COMBINED_MAP_MAX_DISTANCE = 50_000  # Routes closer than this (in meters) share the same map
+ROUTE_PAIR_CACHE_MAX_ENTRIES = 32  # Route pairs kept by each comparison cache
 
 # Page config
 st.set_page_config(
@@ -14,184 +17,235 @@ st.set_page_config(
   page_icon='🗺️',
   layout='wide'
 )
-  
-# GPX file selection
-gpx_files = [f for f in os.listdir(GPX_FILE_PATH) if f.endswith('.gpx')]
-gpx_files.sort()
-
-# GPX file to route name mapping dictionary
-routes_index = pd.read_csv(ROUTES_INDEX_PATH)
-gpx_files_to_route_names = {
-  row['file_name']: row['route_name']
-  for index, row in routes_index.iterrows()
-}
-route_names_to_gpx_files = {
-  v: k for k, v in gpx_files_to_route_names.items()
-}
-
-route1_col, route2_col, col3 = st.columns(3)
-
-with route1_col:
-  selected_route_name_1 = st.selectbox(
-    'Selecione uma rota',
-    gpx_files_to_route_names.values(),
-    index=None,
-    placeholder='Digite ou selecione...'
+
+# The file's modification time is part of the cache key, so the cache is refreshed when
+# the routes index is updated
+@st.cache_data
+def load_routes_index(path, mtime):
+  """Load the routes index."""
+  return pd.read_csv(path)
+
+@st.cache_data
+def load_route_names(path, mtime):
+  """Map the GPX file names to the route names, and the other way around."""
+  routes_index = load_routes_index(path, mtime)
+  gpx_files_to_route_names = dict(zip(
+    routes_index['file_name'].to_numpy(),
+    routes_index['route_name'].to_numpy()
+  ))
+  route_names_to_gpx_files = dict(zip(
+    routes_index['route_name'].to_numpy(),
+    routes_index['file_name'].to_numpy()
+  ))
+  return gpx_files_to_route_names, route_names_to_gpx_files
+
+@st.cache_data
+def load_route_centers(path, mtime):
+  """Map the GPX file names to their center coordinates, as (lat, lon)."""
+  routes_index = pd.read_parquet(path, columns=['file_name', 'latitude', 'longitude'])
+  return dict(zip(
+    routes_index['file_name'].to_numpy(),
+    zip(routes_index['latitude'].to_numpy(), routes_index['longitude'].to_numpy())
+  ))
+
+# Use cache_resource since we don't want to pickle the Route objects, with their
+# DataFrames, on every rerun
+@st.cache_resource
+def get_route(path):
+  """Load a route once and reuse it across reruns."""
+  return Route(path)
+
+# The GPX files don't change, so the figures built from them can be cached as well.
+# Folium maps are rendered to HTML once and displayed with components.html, which
+# skips streamlit-folium's render on every rerun (we don't use its return values)
+@st.cache_resource
+def get_elevation_profile(path):
+  """Build the elevation profile figure of a route."""
+  return get_route(path).plot_elevation_profile()
+
+# The caches keyed on a pair of routes are bounded, since they are shared by every
+# session and there are many more pairs than routes
+@st.cache_resource(max_entries=ROUTE_PAIR_CACHE_MAX_ENTRIES)
+def get_route_group(paths, labels):
+  """Create a RouteGroup from the cached routes."""
+  return RouteGroup(
+    routes=[get_route(path) for path in paths],
+    labels=list(labels)
   )
 
-# Main content
-if selected_route_name_1:
+# The stats are plain data, so cache_data can return a copy of them. They are returned as a
+# dict of {route: {stat: value}}, so the page does plain lookups instead of .loc calls
+@st.cache_data(max_entries=ROUTE_PAIR_CACHE_MAX_ENTRIES)
+def get_compare_stats(paths, labels):
+  """Compare the stats of a group of routes."""
+  return get_route_group(paths, labels).compare_stats().to_dict()
+
+@st.cache_resource(max_entries=ROUTE_PAIR_CACHE_MAX_ENTRIES)
+def get_elevation_comparison(paths, labels):
+  """Build the elevation comparison figure of a group of routes."""
+  return get_route_group(paths, labels).plot_elevation_comparison()
+
+@st.cache_resource(max_entries=ROUTE_PAIR_CACHE_MAX_ENTRIES)
+def get_combined_map_html(paths, labels):
+  """Render the combined map of a group of routes to HTML."""
+  return get_route_group(paths, labels).plot_combined_map().get_root().render()
+
+@st.cache_resource(max_entries=ROUTE_PAIR_CACHE_MAX_ENTRIES)
+def get_side_by_side_maps_html(paths, labels):
+  """Render the maps of a group of routes, side by side, to HTML."""
+  return get_route_group(paths, labels).plot_side_by_side_maps().render()
+
+# GPX file to route name mapping dictionaries
+gpx_files_to_route_names, route_names_to_gpx_files = load_route_names(
+  ROUTES_INDEX_PATH,
+  os.path.getmtime(ROUTES_INDEX_PATH)
+)
+
+# Route centers, to check the distance between routes without using their points. They
+# are read already split from the Parquet routes index
+route_centers = load_route_centers(
+  ROUTES_INDEX_PARQUET_PATH,
+  os.path.getmtime(ROUTES_INDEX_PARQUET_PATH)
+)
 
-  with route2_col:
-    selected_route_name_2 = st.selectbox(
-      'Comparar com',
-      [f for f in gpx_files_to_route_names.values() if f != selected_route_name_1],  # Exclude first selected route
+# Run the route analysis as a fragment, so changing the selected routes only reruns this
+# part of the page instead of the whole script
+@st.fragment
+def route_analysis():
+  """Select routes and display their analysis, or the comparison of two routes."""
+  route1_col, route2_col, col3 = st.columns(3)
+
+  with route1_col:
+    selected_route_name_1 = st.selectbox(
+      'Selecione uma rota',
+      gpx_files_to_route_names.values(),
       index=None,
       placeholder='Digite ou selecione...'
     )
 
-  if selected_route_name_1 and not selected_route_name_2:
-    
-    # Title
-    st.markdown(
-      f"<h1 style='color: {COLORS['main']}'>{selected_route_name_1}</h1>",
-      unsafe_allow_html=True
-    )
+  # Main content
+  if selected_route_name_1:
 
-    # Load the route
-    route1 = Route(os.path.join(GPX_FILE_PATH, route_names_to_gpx_files[selected_route_name_1]))
-    
-    # Display route stats in columns
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-      st.metric('Distância', f"{route1.total_distance/1000:.1f} km")
-    
-    with col2:
-      st.metric('Ganho de elevação', f"{round(route1.elevation_gain):,} m")
-    
-    with col3:
-      st.metric('Perda de elevação', f"{round(route1.elevation_loss):,} m")
-    
-    with col4:
-      st.metric(
-        label='Ganho médio',
-        value=f'{route1.avg_elevation_gain_per_km:.1f} m',
-        help='Ganho médio de elevação por km'
+    with route2_col:
+      selected_route_name_2 = st.selectbox(
+        'Comparar com',
+        [f for f in gpx_files_to_route_names.values() if f != selected_route_name_1],  # Exclude first selected route
+        index=None,
+        placeholder='Digite ou selecione...'
       )
 
-    with col5:
-      st.metric(
-        label=f'Subidas íngremes',
-        value=f"{100*route1.hard_slope_percentage:.1f}%",
-        help=f'Percentual do percurso com inclinação acima de {100*route1.HARD_SLOPE_THRESHOLD:.0f}%.'
-      )
-    
-    # Elevation profile
-    st.subheader('Perfil de elevação')
-    elevation_fig = route1.plot_elevation_profile()
-    st.plotly_chart(elevation_fig, use_container_width=True)
-
-    # Map
-    st.subheader('Mapa')
-    map_fig = route1.plot_map(COLORS['main'])
-    st_folium(
-      map_fig,
-      width='100%',
-      height=500
-    )
+    # Load the first route once. The comparison builds its outputs from the route paths,
+    # through the cached helpers, so the second route only needs its path
+    route1_path = os.path.join(GPX_FILE_PATH, route_names_to_gpx_files[selected_route_name_1])
+    route1 = get_route(route1_path)
+
+    if selected_route_name_2:
+      route2_path = os.path.join(GPX_FILE_PATH, route_names_to_gpx_files[selected_route_name_2])
 
-  if selected_route_name_1 and selected_route_name_2:
+    if selected_route_name_1 and not selected_route_name_2:
     
-    # Titles
-    with route1_col:
+      # Title
       st.markdown(
-        f"<h2 style='color: {COLORS['main']}'>{selected_route_name_1}</h2>",
+        f"<h1 style='color: {COLORS['main']}'>{selected_route_name_1}</h1>",
         unsafe_allow_html=True
       )
+
+      # Display route stats in columns
+      col1, col2, col3, col4, col5 = st.columns(5)
     
-    with route2_col:
-      st.markdown(
-        f"<h2 style='color: {COLORS['secondary']}'>{selected_route_name_2}</h2>",
-        unsafe_allow_html=True
-      )
+      with col1:
+        st.metric('Distância', f"{route1.total_distance/1000:.1f} km")
+    
+      with col2:
+        st.metric('Ganho de elevação', f"{round(route1.elevation_gain):,} m")
+    
+      with col3:
+        st.metric('Perda de elevação', f"{round(route1.elevation_loss):,} m")
+    
+      with col4:
+        st.metric(
+          label='Ganho médio',
+          value=f'{route1.avg_elevation_gain_per_km:.1f} m',
+          help='Ganho médio de elevação por km'
+        )
+
+      with col5:
+        st.metric(
+          label=f'Subidas íngremes',
+          value=f"{100*route1.hard_slope_percentage:.1f}%",
+          help=f'Percentual do percurso com inclinação acima de {100*route1.HARD_SLOPE_THRESHOLD:.0f}%.'
+        )
+    
+      # Elevation profile
+      st.subheader('Perfil de elevação')
+      elevation_fig = get_elevation_profile(route1_path)
+      st.plotly_chart(elevation_fig, use_container_width=True)
+
+      # Map
+      st.subheader('Mapa')
+      components.html(route1.map_html, height=500)
 
-    # Load both routes
-    route1 = Route(os.path.join(GPX_FILE_PATH, route_names_to_gpx_files[selected_route_name_1]))
-    route2 = Route(os.path.join(GPX_FILE_PATH, route_names_to_gpx_files[selected_route_name_2]))
+    if selected_route_name_1 and selected_route_name_2:
     
-    # Create RouteGroup for comparison
-    route_group = RouteGroup(
-      routes=[route1, route2],
-      labels=[selected_route_name_1, selected_route_name_2]
-    )
+      # Titles
+      with route1_col:
+        st.markdown(
+          f"<h2 style='color: {COLORS['main']}'>{selected_route_name_1}</h2>",
+          unsafe_allow_html=True
+        )
+    
+      with route2_col:
+        st.markdown(
+          f"<h2 style='color: {COLORS['secondary']}'>{selected_route_name_2}</h2>",
+          unsafe_allow_html=True
+        )
+
+      route_paths = (route1_path, route2_path)
+      route_labels = (selected_route_name_1, selected_route_name_2)
     
-    # Compare stats
-    stats_df = route_group.compare_stats()
-
-    # Create comparison table
-    comparison_table = f"""
-    <style>
-      table, tr, td, th {{
-        border: none !important;
-        border-collapse: collapse !important;
-        border-spacing: 0 !important;
-        padding: 0 !important;
-        margin: 0 !important;
-      }}
-    </style>
-    <table width="100%">
-      <tr>
-        <td width="33%"><h4 style="color: {COLORS['main']}">{stats_df.loc['Distance (km)'][selected_route_name_1]:.1f} km</h4></td>
-        <td width="33%"><h4 style="color: {COLORS['secondary']}">{stats_df.loc['Distance (km)'][selected_route_name_2]:.1f} km</h4></td>
-        <td><h4>Distância</h4></td>
-      </tr>
-      <tr>
-        <td><h4 style="color: {COLORS['main']}">{stats_df.loc['Elevation Gain (m)'][selected_route_name_1]:,.0f} m</h4></td>
-        <td><h4 style="color: {COLORS['secondary']}">{stats_df.loc['Elevation Gain (m)'][selected_route_name_2]:,.0f} m</h4></td>
-        <td><h4>Ganho de elevação</h4></td>
-      </tr>
-      <tr>
-        <td><h4 style="color: {COLORS['main']}">{stats_df.loc['Elevation Loss (m)'][selected_route_name_1]:,.0f} m</h4></td>
-        <td><h4 style="color: {COLORS['secondary']}">{stats_df.loc['Elevation Loss (m)'][selected_route_name_2]:,.0f} m</h4></td>
-        <td><h4>Perda de elevação</h4></td>
-      </tr>
-      <tr>
-        <td><h4 style="color: {COLORS['main']}">{stats_df.loc['Avg Gain per km (m)'][selected_route_name_1]:.1f} m</h4></td>
-        <td><h4 style="color: {COLORS['secondary']}">{stats_df.loc['Avg Gain per km (m)'][selected_route_name_2]:.1f} m</h4></td>
-        <td><h4>Ganho médio</h4></td>
-      </tr>
-      <tr>
-        <td><h4 style="color: {COLORS['main']}">{stats_df.loc['Hard Slopes (%)'][selected_route_name_1]:.1f}%</h4></td>
-        <td><h4 style="color: {COLORS['secondary']}">{stats_df.loc['Hard Slopes (%)'][selected_route_name_2]:.1f}%</h4></td>
-        <td><h4>Subidas íngremes</h4></td>
-      </tr>
-    </table>
-    """
-
-    st.markdown(comparison_table, unsafe_allow_html=True)
-
-    # Elevation comparison
-    st.subheader('Perfil de elevação')
-    elevation_fig = route_group.plot_elevation_comparison()
-    st.plotly_chart(elevation_fig, use_container_width=True)
+      # Compare stats
+      stats = get_compare_stats(route_paths, route_labels)
+
+      # Stats to compare, as (label, stat, format, help)
+      comparison_stats = [
+        ('Distância', 'Distance (km)', '{:.1f} km', None),
+        ('Ganho de elevação', 'Elevation Gain (m)', '{:,.0f} m', None),
+        ('Perda de elevação', 'Elevation Loss (m)', '{:,.0f} m', None),
+        ('Ganho médio', 'Avg Gain per km (m)', '{:.1f} m', 'Ganho médio de elevação por km'),
+        (
+          'Subidas íngremes',
+          'Hard Slopes (%)',
+          '{:.1f}%',
+          f'Percentual do percurso com inclinação acima de {100*Route.HARD_SLOPE_THRESHOLD:.0f}%.'
+        ),
+      ]
+
+      # Display the stats of each route below its title
+      for route_col, route_name in ((route1_col, selected_route_name_1), (route2_col, selected_route_name_2)):
+        with route_col:
+          for label, stat, value_format, help_text in comparison_stats:
+            st.metric(label, value_format.format(stats[route_name][stat]), help=help_text)
+
+      # Elevation comparison
+      st.subheader('Perfil de elevação')
+      elevation_fig = get_elevation_comparison(route_paths, route_labels)
+      st.plotly_chart(elevation_fig, use_container_width=True)
     
-    # Plot routes on map
-    st.subheader('Mapas')
-
-    # Calculate distance between routes
-    distance = route_group.calculate_routes_distance()
-
-    if distance < 50_000:
-      map_fig = route_group.plot_combined_map()
-      st_folium(map_fig, width='100%', height=500)
-    else:
-      map1_col, map2_col = st.columns(2)
-      
-      with map1_col:
-        map1 = route1.plot_map(COLORS['main'])
-        st_folium(map1, width='100%', height=500)
-        
-      with map2_col:
-        map2 = route2.plot_map(COLORS['secondary'])
-        st_folium(map2, width='100%', height=500)
+      # Plot routes on map
+      st.subheader('Mapas')
+
+      # Calculate distance between routes, using the centers from the routes index
+      distance = calculate_distance(
+        route_centers[route_names_to_gpx_files[selected_route_name_1]],
+        route_centers[route_names_to_gpx_files[selected_route_name_2]]
+      )
+
+      if distance < COMBINED_MAP_MAX_DISTANCE:
+        map_html = get_combined_map_html(route_paths, route_labels)
+        components.html(map_html, height=500)
+      else:
+        # Both maps are in the same page, so Leaflet is only loaded once
+        map_html = get_side_by_side_maps_html(route_paths, route_labels)
+        components.html(map_html, height=500)
+
+route_analysis()
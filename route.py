@@ -1,18 +1,120 @@
 import os
+import functools
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import folium
 import gpxpy
 from utils import COLORS
 
-plt.ioff()  # Turn off interactive mode
+try:
+    from lxml import etree
+except ImportError:  # Fall back to parsing the GPX files with gpxpy
+    etree = None
+
+def _create_map(location, **kwargs):
+    """Create a folium map with the terrain tiles used for the routes.
+
+    Args:
+        location (list[float]): Initial center of the map, as [lat, lon].
+        **kwargs: Additional arguments passed to folium.Map.
+
+    Returns:
+        folium.Map: Empty map
+    """
+    # The plotting libraries are slow to import, so we only import them when needed
+    import folium
+
+    attr = (
+        '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> '
+        'contributors, &copy; <a href="http://viewfinderpanoramas.org">SRTM</a>'
+        '| Map style: &copy; <a href="https://opentopomap.org">OpenTopoMap</a> '
+        '(<a href="https://creativecommons.org/licenses/by-sa/3.0/">CC-BY-SA</a>)'
+    )
+    tiles = 'https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png'
+
+    return folium.Map(
+        location=location,
+        zoom_start=12,
+        # This tileset is good because it shows the terrain, but it takes a little longer to load
+        tiles=tiles,
+        attr=attr,
+        control_scale=True,  # Add distance scale
+        prefer_canvas=True,  # Better performance for large datasets
+        **kwargs
+    )
+
+@functools.lru_cache(maxsize=32)
+def _hex_to_rgb(hex_color):
+    """Convert a '#rrggbb' color to a (r, g, b) tuple."""
+    hex_color = hex_color.lstrip('#')
+    return (int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16))
+
+def _lttb(x, y, n_out=1500):
+    """Downsample a line with the Largest-Triangle-Three-Buckets algorithm.
+
+    Splits the points into buckets and keeps, from each bucket, the point that forms the
+    largest triangle with the previously kept point and the average of the next bucket.
+    This keeps the visual shape of the line with a fraction of the points.
+
+    Args:
+        x (np.ndarray): The x values, sorted in ascending order.
+        y (np.ndarray): The y values.
+        n_out (int, optional): Number of points to keep. Defaults to 1500.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The downsampled x and y values.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    # The first and last points are always kept, the others are split into buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.zeros(n_out, dtype=int)
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average point of the next bucket (the last point, for the last bucket)
+        if i < n_out - 3:
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Keep the point that forms the largest triangle
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + np.argmax(area)
+        indices[i + 1] = a
+
+    return x[indices], y[indices]
+
+def calculate_distance(coordinates1, coordinates2):
+    """Calculate the distance between two points.
+
+    Args:
+        coordinates1 (tuple[float, float]): First point, as (lat, lon).
+        coordinates2 (tuple[float, float]): Second point, as (lat, lon).
+
+    Returns:
+        float: Distance in meters between the points
+    """
+    return gpxpy.geo.distance(
+        coordinates1[0], coordinates1[1], 0,  # lat1, lon1, elevation1
+        coordinates2[0], coordinates2[1], 0   # lat2, lon2, elevation2
+    )
 
 class Route:
     """A class to handle GPX route data and analysis."""
     
     HARD_SLOPE_THRESHOLD = 0.2  # Threshold to consider a section as hard (20% gradient)
+    SLOPE_BIN_WIDTH = 0.1  # Width of the slope bins (10% gradient)
+    PLOT_MAX_POINTS = 2000  # Elevation plots with more points than this are downsampled
+    MAP_SIMPLIFY_TOLERANCE = 1e-4  # Tolerance to simplify the routes in the maps (~10 m)
     
     def __init__(self, gpx_file_path):
         self.gpx_file_path = gpx_file_path
@@ -25,25 +127,78 @@ class Route:
         """Load GPX file and extract track data.
         
         Extracts the points from the first track and segment of the GPX file and stores them
-        as instance attributes.
+        as instance attributes. The file is streamed with lxml when it's available, and parsed
+        with gpxpy otherwise.
         """
-        # Read the GPX file
-        self.gpx_file = gpxpy.parse(open(self.gpx_file_path))
         self.file_name = self.gpx_file_path.split('/')[-1]
 
+        if etree is None:
+            self._load_gpx_with_gpxpy()
+        else:
+            self._load_gpx_with_lxml()
+
+    def _load_gpx_with_lxml(self):
+        """Stream the GPX file, reading only the route name and the first track segment.
+        
+        Tags are matched by their local name, so both GPX 1.0 and 1.1 files are supported.
+        """
+        self.route_name = None
+
+        def read_points():
+            context = etree.iterparse(
+                self.gpx_file_path,
+                events=('end',),
+                tag=('{*}name', '{*}trkpt', '{*}trkseg')
+            )
+            for event, elem in context:
+                tag = etree.QName(elem).localname
+
+                if tag == 'name':
+                    # Same as gpxpy, the route name is the name of the file (GPX 1.0) or of
+                    # its metadata (GPX 1.1), not the name of a track or waypoint
+                    parent = etree.QName(elem.getparent()).localname
+                    if self.route_name is None and parent in ('gpx', 'metadata'):
+                        self.route_name = elem.text
+
+                elif tag == 'trkpt':
+                    ele = elem.find('{*}ele')
+                    yield (
+                        float(elem.get('lat')),
+                        float(elem.get('lon')),
+                        float(ele.text) if ele is not None and ele.text else np.nan
+                    )
+
+                    # Free the points that were already read
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                
+                # Only extract the first track and segment
+                elif tag == 'trkseg':
+                    return
+
+        # Missing elevations are stored as NaN
+        self.coordinates = np.fromiter(read_points(), dtype=np.dtype((np.float64, 3)))
+
+    def _load_gpx_with_gpxpy(self):
+        """Parse the GPX file with gpxpy and extract the first track segment."""
+        # Read the GPX file
+        with open(self.gpx_file_path) as f:
+            gpx_file = gpxpy.parse(f)
+
         # Extract the route name
-        self.route_name = self.gpx_file.name
+        self.route_name = gpx_file.name
         
         # Only extract the first track and segment
-        self.track = self.gpx_file.tracks[0]
-        self.segment = self.track.segments[0]
-        self.points = self.segment.points
+        points = gpx_file.tracks[0].segments[0].points
         
-        # Extract coordinates into numpy array for later processing
-        self.coordinates = np.array([
-            [point.latitude, point.longitude, point.elevation] 
-            for point in self.points
-        ])
+        # Extract coordinates into numpy array for later processing. Missing elevations are
+        # stored as NaN
+        self.coordinates = np.empty((len(points), 3), dtype=np.float64)
+        for i, point in enumerate(points):
+            self.coordinates[i, 0] = point.latitude
+            self.coordinates[i, 1] = point.longitude
+            self.coordinates[i, 2] = np.nan if point.elevation is None else point.elevation
 
     def _process_data(self):
         """Process GPX data into a Pandas DataFrame with calculated metrics.
@@ -55,173 +210,212 @@ class Route:
         - Moving averages for smoothing
         """
         
-        # Create DataFrame
-        self.df = (
-            pd.DataFrame(
-                self.coordinates,
-                columns=['latitude', 'longitude', 'elevation']
-            )
-            # Convert to numeric, handling any non-numeric values
-            .apply(pd.to_numeric, errors='coerce')
-            # There may be missing values in the data, so we interpolate any
-            .interpolate(method='linear', limit_direction='both')
-            .assign(
-                # Add file_name and route_name
-                file_name=self.file_name,
-                route_name=self.route_name,
-                # We add a 0 at the beginning to match the length of the DF
-                elevation_diff=lambda x: np.concatenate(
-                    [[0], np.diff(x['elevation'])]
+        # Copy the coordinates, so the missing values can be interpolated in place
+        coordinates = self.coordinates.copy()
+        has_elevation = ~np.isnan(coordinates[:, 2])
+
+        # There may be missing values in the data, so we interpolate any
+        index = np.arange(len(coordinates))
+        for col in range(coordinates.shape[1]):
+            missing = np.isnan(coordinates[:, col])
+            if missing.any() and not missing.all():
+                coordinates[missing, col] = np.interp(
+                    index[missing],
+                    index[~missing],
+                    coordinates[~missing, col]
                 )
-            )
-            # Reorder columns to put file_name and route_name first
-            .reindex(columns=[
-                'file_name',
-                'route_name',
-                'latitude',
-                'longitude',
-                'elevation',
-                'elevation_diff'
-            ])
+
+        latitude = coordinates[:, 0]
+        longitude = coordinates[:, 1]
+        elevation = coordinates[:, 2]
+
+        # Keep the (lat, lon) pairs for the maps, so they don't need to be selected from the DF
+        self._latlon = coordinates[:, :2]
+
+        # Calculate the distances between consecutive points with a vectorized haversine
+        lat = np.radians(latitude)
+        lon = np.radians(longitude)
+
+        a = (
+            np.sin(np.diff(lat) / 2)**2
+            + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2)**2
+        )
+        # Use the same earth radius as gpxpy, so distances match the ones in the routes index
+        self.distance_between_points_2d = 2 * gpxpy.geo.EARTH_RADIUS * np.arcsin(np.sqrt(a))
+        self.distance_between_points_3d = np.hypot(
+            self.distance_between_points_2d,
+            np.diff(elevation)
         )
-        
-        # Calculate the cumulative distances and slopes
-        self.distance_between_points_3d = np.zeros(len(self.points) - 1)
-        self.distance_between_points_2d = np.zeros(len(self.points) - 1)
-
-        for i in range(0, len(self.points) - 1):
-            self.distance_between_points_3d[i] = gpxpy.geo.distance(
-                self.df.iloc[i]['latitude'],
-                self.df.iloc[i]['longitude'],
-                self.df.iloc[i]['elevation'],
-                self.df.iloc[i+1]['latitude'],
-                self.df.iloc[i+1]['longitude'],
-                self.df.iloc[i+1]['elevation']
-            )
 
-            self.distance_between_points_2d[i] = gpxpy.geo.distance(
-                self.df.iloc[i]['latitude'],
-                self.df.iloc[i]['longitude'],
-                0, # Set elevation to 0 for 2D distance
-                self.df.iloc[i+1]['latitude'],
-                self.df.iloc[i+1]['longitude'],
-                0, # Set elevation to 0 for 2D distance
-            )
+        # Calculate the route totals from the arrays, instead of iterating the gpxpy points.
+        # To match gpxpy, points without elevation only count for the 2D distance, and the
+        # elevations are smoothed before calculating the gain and loss
+        self._total_distance = np.where(
+            has_elevation[:-1] & has_elevation[1:],
+            self.distance_between_points_3d,
+            self.distance_between_points_2d
+        ).sum()
+
+        known_elevation = elevation[has_elevation]
+        smoothed_elevation = known_elevation.copy()
+        smoothed_elevation[1:-1] = (
+            0.3*known_elevation[:-2] + 0.4*known_elevation[1:-1] + 0.3*known_elevation[2:]
+        )
+        smoothed_elevation_diff = np.diff(smoothed_elevation)
+
+        self._elevation_gain = np.clip(smoothed_elevation_diff, 0, None).sum()
+        self._elevation_loss = -np.clip(smoothed_elevation_diff, None, 0).sum()
+
+        # We add a 0 at the beginning of the differences to match the number of points
+        elevation_diff = np.concatenate([[0], np.diff(elevation)])
+        distance_between_points_3d = np.concatenate([[0], self.distance_between_points_3d])
+        distance_between_points_2d = np.concatenate([[0], self.distance_between_points_2d])
+
+        # Calculate slope gradients. Repeated points have no slope, so we set it to 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope_gradient = elevation_diff / distance_between_points_2d
+        slope_gradient[np.isnan(slope_gradient)] = 0
 
         # Bin the slopes - Define bin sizes and labels
-        self.slope_bins = np.arange(-1, 1, 0.1).round(2)
+        self.slope_bins = np.arange(-1, 1, self.SLOPE_BIN_WIDTH).round(2)
         self.slope_bin_labels = [f"{round(100*self.slope_bins[i])} → {round(100*self.slope_bins[i+1])}%" for i in range(len(self.slope_bins) - 1)]
 
-        self.df = (
-            self.df
-            .assign(
-                distance_between_points_3d=np.concatenate(
-                    [[0], self.distance_between_points_3d]
-                ),
-                distance_between_points_2d=np.concatenate(
-                    [[0], self.distance_between_points_2d]
-                ),
-                # Calculate cumulative distance and convert to km
-                cum_distance_3d_km=np.concatenate(
-                    [[0], np.cumsum(self.distance_between_points_3d)/1000]
-                ),
-                cum_distance_2d_km=np.concatenate(
-                    [[0], np.cumsum(self.distance_between_points_2d)/1000]
-                ),
-                #@!todo Calculate cumulative elevation
-                cum_elevation=np.cumsum(self.df['elevation_diff']),
-                # Calculate slope gradients
-                slope_gradient=lambda x: x['elevation_diff']/x['distance_between_points_2d'],
-                # Bin the slopes
-                slope_bin=lambda x: pd.cut(
-                    x['slope_gradient'] + 0.0001,
-                    bins=self.slope_bins,
-                    right=False,
-                    labels=self.slope_bin_labels
-                ),
-                hard_slope=lambda x: abs(x['slope_gradient']) > self.HARD_SLOPE_THRESHOLD
-            )
-            .fillna(
-                {
-                    'slope_gradient': 0,
-                    'slope_bin': '0 → 10%',
-                }
-            )
+        # The bins are uniform, so the bin of each slope can be calculated directly.
+        # Slopes outside the bins go to the 0 → 10% bin
+        slope_bin_codes = np.floor(
+            (slope_gradient + 0.0001 - self.slope_bins[0]) / self.SLOPE_BIN_WIDTH
         )
+        slope_bin_codes[
+            ~((slope_bin_codes >= 0) & (slope_bin_codes < len(self.slope_bin_labels)))
+        ] = self.slope_bin_labels.index('0 → 10%')
+        slope_bin_codes = slope_bin_codes.astype(np.int8)
+
+        # Create DataFrame
+        self.df = pd.DataFrame({
+            'file_name': self.file_name,
+            'route_name': self.route_name,
+            'latitude': latitude,
+            'longitude': longitude,
+            'elevation': elevation,
+            'elevation_diff': elevation_diff,
+            'distance_between_points_3d': distance_between_points_3d,
+            'distance_between_points_2d': distance_between_points_2d,
+            # Calculate cumulative distance and convert to km
+            'cum_distance_3d_km': np.cumsum(distance_between_points_3d) / 1000,
+            'cum_distance_2d_km': np.cumsum(distance_between_points_2d) / 1000,
+            #@!todo Calculate cumulative elevation
+            'cum_elevation': np.cumsum(elevation_diff),
+            'slope_gradient': slope_gradient,
+            'slope_bin': pd.Categorical.from_codes(
+                slope_bin_codes,
+                categories=self.slope_bin_labels,
+                ordered=True
+            ),
+            'hard_slope': np.abs(slope_gradient) > self.HARD_SLOPE_THRESHOLD
+        })
+
+        # The metrics are calculated with float64 for accuracy, but they don't need that
+        # precision, so we store them as float32 to halve their memory. The coordinates are
+        # kept as float64, since float32 would lose about a meter of precision
+        self.df = self.df.astype({
+            column: np.float32
+            for column in [
+                'elevation',
+                'elevation_diff',
+                'distance_between_points_3d',
+                'distance_between_points_2d',
+                'cum_distance_3d_km',
+                'cum_distance_2d_km',
+                'cum_elevation',
+                'slope_gradient',
+            ]
+        })
 
     @property
     def total_distance(self):
         """Get total 3D distance in meters."""
-        return self.segment.length_3d()
+        return self._total_distance
 
     @property
     def elevation_gain(self):
         """Get total elevation gain in meters."""
-        return self.segment.get_uphill_downhill().uphill
+        return self._elevation_gain
 
     @property
     def elevation_loss(self):
         """Get total elevation loss in meters."""
-        return self.segment.get_uphill_downhill().downhill
+        return self._elevation_loss
     
     @property
     def avg_elevation_gain_per_km(self):
         """The average elevation gain per km."""
         return (self.elevation_gain / (self.total_distance / 1000))
     
-    @property
+    # The route doesn't change after it's loaded, so the properties below are only
+    # calculated once
+
+    @functools.cached_property
     def hard_slope_percentage(self):
         """The percentage of route with slopes above HARD_SLOPE_THRESHOLD.
         
         Returns:
             float: Percentage of route with hard slopes (0.0-1.0)
         """
-        hard_slopes = abs(self.df['slope_gradient']) > self.HARD_SLOPE_THRESHOLD
-        hard_slopes_percentage = hard_slopes.sum() / len(self.df)
-        return hard_slopes_percentage
+        return self.df['hard_slope'].mean()
 
-    @property
+    @functools.cached_property
     def center_coordinates(self):
         """Calculate the center point of the route."""
-        return np.mean(
-            self.df[['latitude', 'longitude']].values,
-            axis=0
-        )
+        return np.mean(self._latlon, axis=0)
 
-    @property
+    @functools.cached_property
     def bounds(self):
         """Get the geographical bounds of the route."""
+        lat = self.df['latitude'].to_numpy()
+        lon = self.df['longitude'].to_numpy()
         return {
-            'min_lat': self.df['latitude'].min(),
-            'max_lat': self.df['latitude'].max(),
-            'min_lon': self.df['longitude'].min(),
-            'max_lon': self.df['longitude'].max()
+            'min_lat': lat.min(),
+            'max_lat': lat.max(),
+            'min_lon': lon.min(),
+            'max_lon': lon.max()
         }
     
-    def plot_map(self, color):
+    @functools.cached_property
+    def polyline_latlon(self):
+        """The (lat, lon) pairs of the route as a list, ready to be used in a map polyline.
+
+        The route is simplified with the Ramer-Douglas-Peucker algorithm, which removes the
+        points that don't change its shape by more than MAP_SIMPLIFY_TOLERANCE. This makes
+        the maps much lighter to render, and the start and end points are always kept.
+        """
+        from shapely import LineString
+
+        if len(self._latlon) < 3:
+            return self._latlon.tolist()
+
+        simplified = LineString(self._latlon).simplify(
+            self.MAP_SIMPLIFY_TOLERANCE,
+            preserve_topology=False
+        )
+        return [list(point) for point in simplified.coords]
+
+    @functools.cached_property
+    def map_html(self):
+        """The map of the route in the main color, rendered to HTML."""
+        return self.plot_map(COLORS['main']).get_root().render()
+
+    def plot_map(self, color, **kwargs):
         """Create an interactive map of the route.
+
+        Args:
+            color (str): Color of the route line.
+            **kwargs: Additional arguments passed to folium.Map, e.g. its size and position.
         
         Returns:
             folium.Map: Interactive map showing the route with start/end markers
         """
         # Create map with auto zoom based on center coordinates
-        attr = (
-            '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> '
-            'contributors, &copy; <a href="http://viewfinderpanoramas.org">SRTM</a>'
-            '| Map style: &copy; <a href="https://opentopomap.org">OpenTopoMap</a> '
-            '(<a href="https://creativecommons.org/licenses/by-sa/3.0/">CC-BY-SA</a>)'
-        )
-        tiles = 'https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png'
-        
-        map = folium.Map(
-            location=self.center_coordinates,
-            zoom_start=12,
-            # This tileset is good because it shows the terrain, but it takes a little longer to load
-            tiles=tiles,
-            attr=attr,
-            control_scale=True,  # Add distance scale
-            prefer_canvas=True   # Better performance for large datasets
-        )
+        map = _create_map(self.center_coordinates, **kwargs)
 
         # Fit bounds to the route
         map.fit_bounds(
@@ -232,28 +426,42 @@ class Route:
         )
 
         # Add the route to the map
+        self.add_layer_to(map, color)
+
+        return map
+
+    def add_layer_to(self, folium_map, color, label=None):
+        """Add the route line and its start/end markers to a map.
+
+        Args:
+            folium_map (folium.Map): Map to add the route to.
+            color (str): Color of the route line.
+            label (str, optional): Label shown in the popups of the route. Defaults to None.
+        """
+        import folium
+
+        # Add route line
         folium.PolyLine(
-            self.df[['latitude', 'longitude']].values,
+            self.polyline_latlon,
             weight=5,
             color=color,
             opacity=0.8,
-        ).add_to(map)
+            popup=label,
+        ).add_to(folium_map)
 
         # Add the start point to the map
         folium.Marker(
-            location=self.df.iloc[0][['latitude', 'longitude']].values,
+            location=self.polyline_latlon[0],
             icon=folium.Icon(color='green', icon='play'),
-            popup='Start'
-        ).add_to(map)
+            popup=f'{label} Start' if label else 'Start'
+        ).add_to(folium_map)
 
         # Add the end point to the map
         folium.Marker(
-            location=self.df.iloc[-1][['latitude', 'longitude']].values,
+            location=self.polyline_latlon[-1],
             icon=folium.Icon(color='red', icon='stop'),
-            popup='Finish'
-        ).add_to(map)
-
-        return map
+            popup=f'{label} Finish' if label else 'Finish'
+        ).add_to(folium_map)
     
     def plot_elevation_profile(self):
         """Create an interactive elevation profile plot.
@@ -261,24 +469,26 @@ class Route:
         Returns:
             plotly.graph_objects.Figure: Interactive elevation profile plot
         """
-        # Create the plot
-        fig = px.line(
-            x=self.df['cum_distance_3d_km'],
-            y=self.df['elevation'],
-            labels={
-                'x': 'Distância (km)',
-                'y': 'Elevação (m)'
-            }
-        )
-
-        # Update line style and add fill
-        fig.update_traces(
-            line_color=COLORS['main'],
-            line_width=4,
-            fill='tonexty',
-            fillcolor=f"rgba{tuple(int(COLORS['main'].lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (0.1,)}",
-            mode='lines',
-            hovertemplate='Distância: %{x:.1f} km<br>Elevação: %{y:,.0f} m<extra></extra>'
+        import plotly.graph_objects as go
+
+        x = self.df['cum_distance_3d_km'].to_numpy()
+        y = self.df['elevation'].to_numpy()
+
+        # Downsample long routes, since the plot looks the same with fewer points
+        if len(self.df) > self.PLOT_MAX_POINTS:
+            x, y = _lttb(x, y)
+
+        # Create the plot. Use a WebGL trace, which renders long lines much faster than SVG
+        fig = go.Figure(
+            go.Scattergl(
+                x=x,
+                y=y,
+                mode='lines',
+                line=dict(color=COLORS['main'], width=4),
+                fill='tonexty',
+                fillcolor=f"rgba{_hex_to_rgb(COLORS['main']) + (0.1,)}",
+                hovertemplate='Distância: %{x:.1f} km<br>Elevação: %{y:,.0f} m<extra></extra>'
+            )
         )
 
         # Update layout
@@ -323,6 +533,9 @@ class Route:
         Returns:
             matplotlib.figure.Figure: Histogram showing distribution of slopes
         """
+        import matplotlib.pyplot as plt
+        plt.ioff()  # Turn off interactive mode
+
         # Calculate slope distribution
         slope_df = (
             self.df
@@ -421,6 +634,8 @@ class RouteGroup:
         Returns:
             plotly.graph_objects.Figure: Interactive elevation comparison plot
         """
+        import plotly.express as px
+
         if not self.routes:
             raise ValueError("No routes to compare")
 
@@ -435,10 +650,17 @@ class RouteGroup:
         # Add each route to the plot
         for i, (route, label) in enumerate(zip(self.routes, self.labels)):
             color = colors[i % len(colors)]  # Cycle through colors if more routes than colors
+
+            x = route.df['cum_distance_3d_km'].to_numpy()
+            y = route.df['cum_elevation'].to_numpy()
+
+            # Downsample long routes, since the plot looks the same with fewer points
+            if len(route.df) > route.PLOT_MAX_POINTS:
+                x, y = _lttb(x, y)
             
             fig.add_scatter(
-                x=route.df['cum_distance_3d_km'],
-                y=route.df['cum_elevation'],
+                x=x,
+                y=y,
                 name=label,
                 line=dict(color=color, width=4),
                 hovertemplate=(
@@ -503,16 +725,11 @@ class RouteGroup:
         if len(self.routes) != 2:
             return 0
             
-        center1 = self.routes[0].center_coordinates
-        center2 = self.routes[1].center_coordinates
-
-        distance = gpxpy.geo.distance(
-            center1[0], center1[1], 0,  # lat1, lon1, elevation1
-            center2[0], center2[1], 0   # lat2, lon2, elevation2
+        return calculate_distance(
+            self.routes[0].center_coordinates,
+            self.routes[1].center_coordinates
         )
 
-        return distance
-
     def plot_combined_map(self):
         """Create an interactive map showing all routes in the group.
         
@@ -530,22 +747,7 @@ class RouteGroup:
         center_lon = (min_lon + max_lon) / 2
 
         # Create base map
-        attr = (
-            '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> '
-            'contributors, &copy; <a href="http://viewfinderpanoramas.org">SRTM</a>'
-            '| Map style: &copy; <a href="https://opentopomap.org">OpenTopoMap</a> '
-            '(<a href="https://creativecommons.org/licenses/by-sa/3.0/">CC-BY-SA</a>)'
-        )
-        tiles = 'https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png'
-        
-        map = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=12,
-            tiles=tiles,
-            attr=attr,
-            control_scale=True,
-            prefer_canvas=True
-        )
+        map = _create_map([center_lat, center_lon])
 
         # Fit bounds to include all routes
         map.fit_bounds(
@@ -558,28 +760,37 @@ class RouteGroup:
         # Add each route to the map
         for i, (route, label) in enumerate(zip(self.routes, self.labels)):
             color = colors[i % len(colors)]
-            
-            # Add route line
-            folium.PolyLine(
-                route.df[['latitude', 'longitude']].values,
-                weight=5,
-                color=color,
-                opacity=0.8,
-                popup=label,
-            ).add_to(map)
-
-            # Add start marker
-            folium.Marker(
-                location=route.df.iloc[0][['latitude', 'longitude']].values,
-                icon=folium.Icon(color='green', icon='play'),
-                popup=f'{label} Start'
-            ).add_to(map)
-
-            # Add end marker
-            folium.Marker(
-                location=route.df.iloc[-1][['latitude', 'longitude']].values,
-                icon=folium.Icon(color='red', icon='stop'),
-                popup=f'{label} Finish'
-            ).add_to(map)
-
-        return map
\ No newline at end of file
+            route.add_layer_to(map, color, label=label)
+
+        return map
+
+    def plot_side_by_side_maps(self):
+        """Create a page with a map for each route in the group, side by side.
+
+        Each route has its own map, for routes that are too far apart to be shown on the
+        same one. The maps aren't synchronized, but they are in the same HTML page, so
+        Leaflet and its plugins are only loaded once.
+
+        Returns:
+            branca.element.Figure: Page with the maps of all routes
+        """
+        from branca.element import Figure
+
+        figure = Figure()
+
+        # Color cycle for multiple routes
+        colors = [v for v in COLORS.values()]
+        width = 100 / len(self.routes)
+
+        for i, route in enumerate(self.routes):
+            color = colors[i % len(colors)]
+            figure.add_child(
+                route.plot_map(
+                    color,
+                    width=f'{width}%',
+                    left=f'{i * width}%',
+                    position='absolute'
+                )
+            )
+
+        return figure
@@ -0,0 +1,67 @@
+"""Build the routes index used by the home page.
+
+Reads the routes index CSV created by `process-gpx.ipynb`, splits the center coordinates
+into latitude and longitude, converts the distances to km and renames the columns for
+display. The numeric columns are stored as float32, which is plenty for the one decimal
+shown on the home page and halves what is sent to the browser. The result is saved as
+Parquet, so the home page can load it already typed, without parsing any strings.
+
+Run it from the root of the repository, after updating the routes index:
+
+    python scripts/build_routes_index.py
+"""
+import numpy as np
+import pandas as pd
+
+ROUTES_INDEX_PATH = 'data/routes-index.csv'
+ROUTES_INDEX_PARQUET_PATH = 'data/routes-index.parquet'
+
+def build_routes_index(csv_path=ROUTES_INDEX_PATH, parquet_path=ROUTES_INDEX_PARQUET_PATH):
+    """Convert the routes index CSV to the Parquet file used by the home page.
+
+    Args:
+        csv_path (str, optional): Path to the routes index CSV. Defaults to
+            ROUTES_INDEX_PATH.
+        parquet_path (str, optional): Path to save the Parquet file to. Defaults to
+            ROUTES_INDEX_PARQUET_PATH.
+
+    Returns:
+        DataFrame: The routes index, as saved to the Parquet file.
+    """
+    routes_index = pd.read_csv(csv_path)
+
+    # The center coordinates are stored as '[lat lon]', split them in a single vectorized pass
+    coordinates = (
+        routes_index['center_coordinates']
+        .str.strip('[]')
+        .str.split(expand=True)
+        .astype(np.float32)
+    )
+
+    df = (
+        routes_index
+        .assign(
+            latitude=coordinates[0],
+            longitude=coordinates[1],
+        )
+        .sort_values(by='route_name')
+        .reset_index(drop=True)
+        .assign(
+            route_distance_m=lambda x: (x['route_distance_m'] / 1000).astype(np.float32),
+            avg_elevation_gain_per_km=lambda x: x['avg_elevation_gain_per_km'].astype(np.float32),
+        )
+        .rename(columns={
+            'route_name': 'Rota',
+            'route_distance_m': 'Distância (km)',
+            'avg_elevation_gain_per_km': 'Ganho médio por km (m)'
+        })
+        .drop(columns='center_coordinates')
+    )
+
+    df.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+
+    return df
+
+if __name__ == '__main__':
+    df = build_routes_index()
+    print(f"Saved {len(df)} routes to {ROUTES_INDEX_PARQUET_PATH}")
@@ -1,14 +1,14 @@
 import streamlit as st
 from streamlit_folium import st_folium
 import folium
+from folium.plugins import FastMarkerCluster
 import os
 import pandas as pd
 import plotly.express as px
-from route import Route, RouteGroup
 from utils import COLORS
-import numpy as np
 
-ROUTES_INDEX_PATH = 'data/routes-index.csv'
+ROUTES_INDEX_PATH = 'data/routes-index.parquet'
+MARKER_CLUSTER_THRESHOLD = 1_000  # Above this number of routes, the map markers are clustered
 
 # Page config
 st.set_page_config(
@@ -17,25 +17,22 @@ st.set_page_config(
   layout='wide'
 )
 
+# The routes index is prepared by scripts/build_routes_index.py, so it's loaded already
+# typed. The file's modification time is part of the cache key, so the cache is refreshed
+# when the routes index is updated
+@st.cache_data
+def load_routes_index(path, mtime):
+  """Load the routes index, with the distances in km and the center coordinates split."""
+  return pd.read_parquet(path)
+
 st.markdown('# Todas as rotas')
 
+# Round the values instead of formatting them with a Styler, which is slow to render
 df = (
-  pd.read_csv(ROUTES_INDEX_PATH)
-  .sort_values(by='route_name')
-  .reset_index(drop=True)
-  .assign(
-    route_distance_m=lambda x: x['route_distance_m'] / 1000,
-    latitude=lambda x: x['center_coordinates'].apply(lambda y: float(y.strip('[]').split()[0])),
-    longitude=lambda x: x['center_coordinates'].apply(lambda y: float(y.strip('[]').split()[1])),
-  )
-  .rename(columns={
-    'route_name': 'Rota',
-    'route_distance_m': 'Distância (km)',
-    'avg_elevation_gain_per_km': 'Ganho médio por km (m)'
-  })
-  .style.format({
-    'Distância (km)': '{:.1f}',
-    'Ganho médio por km (m)': '{:.1f}'
+  load_routes_index(ROUTES_INDEX_PATH, os.path.getmtime(ROUTES_INDEX_PATH))
+  .round({
+    'Distância (km)': 1,
+    'Ganho médio por km (m)': 1
   })
 )
 
@@ -46,21 +43,55 @@ st.markdown('## Mapa mundi')
 # Create a base map centered on the mean coordinates
 m = folium.Map(
     # location=[-17, -50],
-    location=[df.data['latitude'].mean(), df.data['longitude'].mean()],
+    location=[df['latitude'].mean(), df['longitude'].mean()],
     zoom_start=3,
     control_scale=True,  # Add distance scale
     prefer_canvas=True   # Better performance for large datasets
 )
 
-# Add markers for each route
-for idx, row in df.data.iterrows():
-    folium.Circle(
-        location=[row['latitude'], row['longitude']],
-        radius=2_000,
-        tooltip=row['Rota'],
-        color=COLORS['main'],
-        fill=True,
-        fill_opacity=0.3,
+# Use lists, so the values are plain Python types that can be serialized
+latitudes = df['latitude'].tolist()
+longitudes = df['longitude'].tolist()
+route_names = df['Rota'].tolist()
+
+if len(df) > MARKER_CLUSTER_THRESHOLD:
+    # With many routes, cluster the markers so the browser only draws the visible ones
+    FastMarkerCluster(
+        data=list(zip(latitudes, longitudes, route_names)),
+        callback=f"""
+            function (row) {{
+                var marker = L.circle(new L.LatLng(row[0], row[1]), {{
+                    radius: 2000,
+                    color: '{COLORS['main']}',
+                    fill: true,
+                    fillOpacity: 0.3
+                }});
+                marker.bindTooltip(row[2]);
+                return marker;
+            }};
+        """,
+    ).add_to(m)
+else:
+    # Add a marker for each route. All the markers go in a single GeoJSON layer, which
+    # Leaflet handles much better than one layer per marker
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'name': name},
+        }
+        for lat, lon, name in zip(latitudes, longitudes, route_names)
+    ]
+
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features},
+        marker=folium.Circle(
+            radius=2_000,
+            color=COLORS['main'],
+            fill=True,
+            fill_opacity=0.3,
+        ),
+        tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False),
     ).add_to(m)
 
 # Display the map
@@ -71,10 +102,11 @@ st_folium(m, use_container_width=True)
 st.markdown('## Distância vs elevação')
 
 fig = px.scatter(
-    df.data,  # Need to use .data since df is a Styler object
+    df,
     x='Distância (km)',
     y='Ganho médio por km (m)',
     hover_data=['Rota'],
+    render_mode='webgl',  # WebGL keeps the plot responsive with many routes
 )
 
 fig.update_traces(
@@ -96,6 +128,10 @@ st.dataframe(
     'Distância (km)',
     'Ganho médio por km (m)'
   ],
+  column_config={
+    'Distância (km)': st.column_config.NumberColumn(format='%.1f'),
+    'Ganho médio por km (m)': st.column_config.NumberColumn(format='%.1f')
+  },
   hide_index=True,
   use_container_width=True
 )
\ No newline at end of file